@@ -1,170 +1,184 @@
-from moviepy.editor import VideoFileClip, concatenate_videoclips
 import numpy as np
-import wave
 import os
+import subprocess
+import tempfile
 import time
-from tqdm import tqdm
 import glob
+from functools import partial
+from multiprocessing import Pool
 
-def print_device_info():
-    """Print information about available computing devices"""
+# Set bits per byte, for counting packed silence masks on NumPy < 2.0
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _ffmpeg_succeeds(args):
+    """Run a short FFmpeg command and report whether it exited cleanly"""
     try:
-        from numba import cuda
-        if cuda.is_available():
-            device = cuda.get_current_device()
-            print(f"\n{'='*50}")
-            print("🟢 GPU MODE ACTIVE")
-            print(f"GPU Device: {device.name}")
-            print(f"Compute Capability: {device.compute_capability}")
-            print(f"Maximum Threads per Block: {device.MAX_THREADS_PER_BLOCK}")
-            print(f"{'='*50}\n")
-            return True
-        else:
-            print(f"\n{'='*50}")
-            print("🔴 GPU NOT AVAILABLE - Falling back to CPU mode")
-            print("Make sure NVIDIA drivers and CUDA toolkit are installed")
-            print(f"{'='*50}\n")
-            return False
-    except ImportError:
-        print(f"\n{'='*50}")
-        print("🔴 CUDA LIBRARIES NOT FOUND - Falling back to CPU mode")
-        print("Install required packages with:")
-        print("pip install numba cupy-cuda12x")
-        print(f"{'='*50}\n")
+        result = subprocess.run(["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", *args],
+                                capture_output=True)
+        return result.returncode == 0
+    except Exception as e:
+        print(f"⚠️ Could not run FFmpeg: {str(e)}")
         return False
 
-def remove_silence(video_path, threshold=0.01, min_silence_duration=1):
+def has_nvenc():
+    """Check that h264_nvenc can actually encode on this machine, not just that it is compiled in"""
+    return _ffmpeg_succeeds(["-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+                             "-frames:v", "1", "-c:v", "h264_nvenc", "-pix_fmt", "yuv420p",
+                             "-f", "null", "-"])
+
+def has_cuda_hwaccel():
+    """Check that FFmpeg can open a CUDA device for hardware decoding"""
+    return _ffmpeg_succeeds(["-init_hw_device", "cuda", "-f", "lavfi", "-i", "nullsrc=s=64x64:d=0.1",
+                             "-frames:v", "1", "-f", "null", "-"])
+
+def encode_segments(video_path, video_filter, audio_filter, output_path, hwaccel, nvenc):
+    """Decode, filter and encode the video in a single FFmpeg pass"""
+    subprocess.run(["ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+                    *(["-hwaccel", "cuda"] if hwaccel else []),
+                    "-i", video_path,
+                    "-filter_script:v", video_filter,
+                    "-filter_script:a", audio_filter,
+                    "-c:v", "h264_nvenc" if nvenc else "libx264",
+                    "-preset", "fast",
+                    # 4:2:0 like moviepy always wrote; 4:4:4 sources would otherwise
+                    # produce High 4:4:4 files many players reject
+                    "-pix_fmt", "yuv420p",
+                    "-c:a", "aac",
+                    output_path],
+                   check=True)
+
+def extract_audio(video_path, sample_rate):
+    """Decode the audio track to mono int16 PCM through an FFmpeg pipe"""
+    proc = subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", "-i", video_path,
+                           "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+                          stdout=subprocess.PIPE, check=True)
+    return np.frombuffer(proc.stdout, np.int16)
+
+def remove_silence(video_path, threshold=0.01, min_silence_duration=1,
+                   use_hwaccel=False, use_nvenc=False):
     """
-    Remove silent parts from a video file using GPU if available.
+    Remove silent parts from a video file, decoding and encoding on GPU if enabled.
     
     Args:
         video_path: Path to input video file
         threshold: Volume threshold below which audio is considered silent
         min_silence_duration: Minimum duration of silence in seconds
+        use_hwaccel: Decode with CUDA (see has_cuda_hwaccel)
+        use_nvenc: Encode with h264_nvenc (see has_nvenc)
     """
     try:
-        # Check for GPU availability
-        use_gpu = print_device_info()
-        
-        if use_gpu:
-            try:
-                from numba import cuda
-                
-                @cuda.jit
-                def detect_silence_gpu(audio_data, threshold, is_silent):
-                    """CUDA kernel for parallel silence detection"""
-                    idx = cuda.grid(1)
-                    if idx < audio_data.shape[0]:
-                        is_silent[idx] = abs(audio_data[idx]) < threshold
-            except ImportError:
-                print("Failed to initialize CUDA functions - falling back to CPU")
-                use_gpu = False
-
-        print(f"⏳ Loading video {video_path}...")
-        video = VideoFileClip(video_path)
-        
-        print("⏳ Extracting audio...")
-        temp_audio = "temp_audio.wav"
-        video.audio.write_audiofile(temp_audio, fps=44100, verbose=False, logger=None)
-        
+        # Only the audio track is needed for silence detection; the video is
+        # decoded once, by FFmpeg, when the output is written
+        print(f"⏳ Extracting audio from {video_path}...")
+        # Silence detection doesn't need 44.1 kHz; read straight into memory
+        sample_rate = 22050
+        audio_data = extract_audio(video_path, sample_rate)
+        audio_duration = len(audio_data) / sample_rate
+
         print("⏳ Analyzing audio...")
         processing_start = time.time()
-        
-        with wave.open(temp_audio, 'rb') as wf:
-            audio_data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
-            if wf.getnchannels() == 2:
-                audio_data = audio_data.reshape(-1, 2).mean(axis=1)
-            
-            audio_data = audio_data.astype(np.float32) / np.max(np.abs(audio_data))
-            
-            if use_gpu:
-                print("🔄 Processing on GPU...")
-                threadsperblock = 256
-                blockspergrid = (audio_data.shape[0] + (threadsperblock - 1)) // threadsperblock
-                
-                d_audio = cuda.to_device(audio_data)
-                d_is_silent = cuda.device_array(audio_data.shape[0], dtype=np.bool_)
-                
-                detect_silence_gpu[blockspergrid, threadsperblock](d_audio, threshold, d_is_silent)
-                cuda.synchronize()
-                
-                is_silent = d_is_silent.copy_to_host()
-            else:
-                print("🔄 Processing on CPU...")
-                is_silent = np.abs(audio_data) < threshold
-            
+
+        # Compare in the int16 domain instead of normalizing to float. FFmpeg
+        # already downmixed to mono. Samples can reach -32768, where np.abs
+        # overflows, so test both bounds instead of taking the absolute value.
+        peak = max(int(audio_data.max()), -int(audio_data.min()))
+        thr_i16 = int(threshold * peak)
+
+        is_silent = (audio_data > -thr_i16) & (audio_data < thr_i16)
+
         processing_time = time.time() - processing_start
-        print(f"✨ Audio analysis completed in {processing_time:.2f} seconds using {'GPU' if use_gpu else 'CPU'}")
+        print(f"✨ Audio analysis completed in {processing_time:.2f} seconds")
             
         # Group samples into windows
-        window_size = int(44100 * min_silence_duration)
+        window_size = int(sample_rate * min_silence_duration)
         num_windows = len(is_silent) // window_size
         
         keep_segments = []
         start_time = 0
-        
+
         print("⏳ Processing segments...")
-        for i in tqdm(range(num_windows)):
-            window = is_silent[i * window_size:(i + 1) * window_size]
-            if np.mean(window) < 0.8:  # If less than 80% of window is silent
-                continue
-            else:
-                if start_time < (i * window_size / 44100):
-                    keep_segments.append((
-                        start_time,
-                        i * window_size / 44100
-                    ))
-                start_time = (i + 1) * window_size / 44100
-        
-        if start_time < video.duration:
-            keep_segments.append((start_time, video.duration))
-        
-        os.remove(temp_audio)
+        # A window is silent if at least 80% of its samples are silent. Pack the
+        # mask to one bit per sample and popcount each row; packbits pads rows
+        # with zero bits, so the counts stay exact.
+        windows = is_silent[:num_windows * window_size].reshape(num_windows, window_size)
+        packed = np.packbits(windows, axis=1)
+        if hasattr(np, "bitwise_count"):
+            silent_counts = np.bitwise_count(packed).sum(axis=1, dtype=np.int64)
+        else:
+            silent_counts = _POPCOUNT_TABLE[packed].sum(axis=1, dtype=np.int64)
+        silent_windows = silent_counts >= 0.8 * window_size
+
+        # Edges of each run of silent windows, as (start_window, end_window) pairs
+        edges = np.flatnonzero(np.diff(np.r_[False, silent_windows, False]))
+        for silence_start, silence_end in edges.reshape(-1, 2):
+            if start_time < (silence_start * window_size / sample_rate):
+                keep_segments.append((
+                    start_time,
+                    silence_start * window_size / sample_rate
+                ))
+            start_time = silence_end * window_size / sample_rate
+
+        if start_time < audio_duration:
+            keep_segments.append((start_time, audio_duration))
         
         print("⏳ Creating output video...")
         if keep_segments:
-            clips = []
-            for start, end in tqdm(keep_segments, desc="Processing video segments"):
-                clips.append(video.subclip(start, end))
-            
-            final_video = concatenate_videoclips(clips)
-            
             output_path = video_path.rsplit('.', 1)[0] + '_no_silence.mp4'
-            print(f"💾 Saving to {output_path}...")
-            
-            # Try to use GPU encoding if available
-            try:
-                final_video.write_videofile(output_path, 
-                                          audio_codec='aac',
-                                          codec='h264_nvenc' if use_gpu else 'libx264',
-                                          preset='fast',
-                                          verbose=False,
-                                          logger=None)
-                print(f"✅ Video saved successfully using {'GPU' if use_gpu else 'CPU'} encoder!")
-            except Exception as e:
-                print(f"⚠️ GPU encoding failed, falling back to CPU: {str(e)}")
-                final_video.write_videofile(output_path, 
-                                          audio_codec='aac',
-                                          codec='libx264',
-                                          preset='fast',
-                                          verbose=False,
-                                          logger=None)
-            
-            final_video.close()
+
+            # Keep only the non-silent ranges with one select filtergraph, so the
+            # source is decoded once and encoded once
+            expr = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in keep_segments)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                # Filter scripts avoid command-line length limits on long videos
+                video_filter = os.path.join(temp_dir, "video_filter.txt")
+                audio_filter = os.path.join(temp_dir, "audio_filter.txt")
+                with open(video_filter, 'w', encoding='utf-8') as f:
+                    f.write(f"select='{expr}',setpts=N/FRAME_RATE/TB")
+                with open(audio_filter, 'w', encoding='utf-8') as f:
+                    f.write(f"aselect='{expr}',asetpts=N/SR/TB")
+
+                print(f"💾 Saving to {output_path}...")
+                # Try the GPU setup first, then drop hardware decoding (e.g. a codec
+                # NVDEC doesn't support), then fall back to the CPU encoder
+                attempts = [(use_hwaccel, use_nvenc)]
+                if use_hwaccel:
+                    attempts.append((False, use_nvenc))
+                if use_nvenc:
+                    attempts.append((False, False))
+                for i, (hwaccel, nvenc) in enumerate(attempts):
+                    try:
+                        encode_segments(video_path, video_filter, audio_filter, output_path,
+                                        hwaccel, nvenc)
+                        print(f"✅ Video saved successfully using {'GPU' if nvenc else 'CPU'} encoder!")
+                        break
+                    except subprocess.CalledProcessError as e:
+                        if i == len(attempts) - 1:
+                            raise
+                        step = "GPU decoding" if hwaccel else "GPU encoding"
+                        print(f"⚠️ {step} failed, retrying without it: {str(e)}")
         
-        video.close()
         print("✅ Processing completed!")
         
     except Exception as e:
         print(f"❌ An error occurred: {str(e)}")
-        if os.path.exists("temp_audio.wav"):
-            os.remove("temp_audio.wav")
 
 if __name__ == "__main__":
 
     input_folder_path = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\Prueba\RawVideos"
     video_files = glob.glob(os.path.join(input_folder_path, "*.mp4"))
     
-    for video_path in video_files:
-        print(f"🔍 Processing file: {video_path}")
-        remove_silence(video_path)
+    # Process files in parallel; each worker handles one video at a time
+    if video_files:
+        # Probe the GPU once here; spawned workers re-import this module, so
+        # probing at import time would repeat it (and an NVENC session) per worker
+        use_nvenc = has_nvenc()
+        use_hwaccel = has_cuda_hwaccel()
+
+        workers = min(4, os.cpu_count() or 1, len(video_files))
+        if use_nvenc:
+            # Consumer GPUs only allow a few concurrent NVENC sessions
+            workers = min(workers, int(os.environ.get("NVENC_MAX_SESSIONS", 2)))
+        print(f"🔍 Processing {len(video_files)} files with {workers} workers")
+        with Pool(processes=workers) as pool:
+            worker = partial(remove_silence, use_hwaccel=use_hwaccel, use_nvenc=use_nvenc)
+            list(pool.imap_unordered(worker, video_files))
@@ -1,38 +1,75 @@
-import torch
-import whisper
+import subprocess
+import numpy as np
+import ctranslate2
+from faster_whisper import WhisperModel, BatchedInferencePipeline
 import os
 from pathlib import Path
 from glob import glob
 
+def format_timestamp(seconds):
+    """Convierte segundos a formato SRT horas:minutos:segundos,milisegundos"""
+    hours, rem = divmod(int(seconds * 1000), 3600000)
+    minutes, rem = divmod(rem, 60000)
+    secs, millis = divmod(rem, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+def extract_audio(video_path):
+    """
+    Extrae el audio del video como PCM mono a 16 kHz, el formato que espera Whisper
+    
+    Args:
+        video_path (str): Ruta al archivo de video
+    
+    Returns:
+        np.ndarray: Muestras float32 normalizadas en [-1, 1]
+    """
+    proc = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", video_path,
+         "-ac", "1", "-ar", "16000", "-f", "s16le", "-"],
+        stdout=subprocess.PIPE, check=True
+    )
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
 def write_srt(segments, file):
     """
     Escribe subtítulos en formato .srt a partir de los segmentos proporcionados.
     
     Args:
-        segments (list): Lista de segmentos con 'start', 'end', y 'text'.
+        segments (iterable): Segmentos de faster-whisper con atributos 'start', 'end' y 'text'.
         file (file object): Objeto de archivo donde se escribirán los subtítulos.
     """
-    for i, segment in enumerate(segments):
-        # Escribir el número de secuencia
-        file.write(f"{i + 1}\n")
-        
-        # Convertir el tiempo de inicio y fin a formato horas:minutos:segundos,milisegundos
-        start = segment['start']
-        end = segment['end']
-        start_time = f"{int(start // 3600):02}:{int((start % 3600) // 60):02}:{int(start % 60):02},{int((start * 1000) % 1000):03}"
-        end_time = f"{int(end // 3600):02}:{int((end % 3600) // 60):02}:{int(end % 60):02},{int((end * 1000) % 1000):03}"
-        
-        # Escribir el rango de tiempo
-        file.write(f"{start_time} --> {end_time}\n")
-        
-        # Escribir el texto del segmento
-        file.write(f"{segment['text']}\n\n")
+    # Construir todo el archivo en memoria y escribirlo de una sola vez
+    parts = []
+    append = parts.append
+    for i, segment in enumerate(segments, start=1):
+        append(f"{i}\n{format_timestamp(segment.start)} --> {format_timestamp(segment.end)}\n{segment.text}\n\n")
+    file.write("".join(parts))
+
+def load_model():
+    """
+    Carga el modelo de Whisper en la GPU si está disponible
+    
+    Returns:
+        BatchedInferencePipeline: Modelo listo para transcribir por lotes
+    """
+    # Verificar si hay GPU disponible
+    device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    gpu_status = "🚀 GPU activada" if device == "cuda" else "💻 Procesando en CPU"
+    print(f"{gpu_status} - Usando dispositivo: {device}")
+    
+    # Cargar el modelo de Whisper (FP16 en GPU, int8 en CPU)
+    print("🔄 Cargando modelo de Whisper... Por favor espera.")
+    compute_type = "float16" if device == "cuda" else "int8"
+    model = WhisperModel("medium", device=device, compute_type=compute_type)
+    print("✅ Modelo cargado exitosamente.")
+    return BatchedInferencePipeline(model=model)
 
-def generate_subtitles(video_path):
+def generate_subtitles(model, video_path):
     """
     Genera subtítulos en formato .srt para un video usando Whisper
     
     Args:
+        model (BatchedInferencePipeline): Modelo de Whisper ya cargado
         video_path (str): Ruta al archivo de video
     
     Returns:
@@ -43,19 +80,24 @@ def generate_subtitles(video_path):
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"No se encontró el archivo: {video_path}")
         
-        # Verificar si hay GPU disponible
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        gpu_status = "🚀 GPU activada" if device == "cuda" else "💻 Procesando en CPU"
-        print(f"{gpu_status} - Usando dispositivo: {device}")
+        # Decodificar el audio una sola vez; el mismo arreglo se usa para el VAD
+        # y para la transcripción
+        print(f"🎧 Extrayendo audio del video: {video_path}")
+        audio = extract_audio(video_path)
         
-        # Cargar el modelo de Whisper
-        print("🔄 Cargando modelo de Whisper... Por favor espera.")
-        model = whisper.load_model("medium", device=device)
-        print("✅ Modelo cargado exitosamente.")
-        
-        # Transcribir el video
+        # Transcribir el video en lotes de ventanas de 30 s, omitiendo con VAD
+        # las ventanas sin voz
         print(f"🎙️ Iniciando transcripción del video: {video_path}")
-        result = model.transcribe(video_path)
+        segments, _ = model.transcribe(
+            audio,
+            batch_size=16,
+            beam_size=5,
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=500)
+        )
+        # Los segmentos se generan de forma perezosa; consumirlos antes de abrir
+        # el archivo evita dejar un .srt vacío si la transcripción falla
+        segments = list(segments)
         
         # Generar ruta de salida con extensión .srt
         output_path = Path(video_path).with_suffix('.srt')
@@ -63,7 +105,7 @@ def generate_subtitles(video_path):
         # Guardar subtítulos en formato .srt
         print(f"💾 Guardando subtítulos en: {output_path}")
         with open(output_path, 'w', encoding='utf-8') as f:
-            write_srt(result["segments"], f)
+            write_srt(segments, f)
                 
         print("🎉 ¡Subtítulos generados exitosamente!")
         return str(output_path)
@@ -83,10 +125,13 @@ if __name__ == "__main__":
         print("🔍 No se encontraron archivos que coincidan con el patrón.")
     else:
         print(f"📝 Encontrados {len(video_files)} archivos para procesar.")
+        
+        # Cargar el modelo una sola vez para todos los archivos
+        model = load_model()
         for video_path in video_files:
             try:
                 print(f"\n🔹 Procesando archivo: {video_path}")
-                subtitle_path = generate_subtitles(video_path)
+                subtitle_path = generate_subtitles(model, video_path)
                 print(f"✅ Subtítulos guardados en: {subtitle_path}")
             except Exception as e:
                 print(f"❌ Error en el procesamiento del archivo {video_path}: {str(e)}")
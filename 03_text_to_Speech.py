@@ -1,9 +1,22 @@
 import os
 import re
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import List, Optional
-from googletrans import Translator
+from typing import List, Optional, Union
+import numpy as np
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    HAS_LOCAL_MODEL = True
+except ImportError:
+    HAS_LOCAL_MODEL = False
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
 
 # Configuración de logging
 logging.basicConfig(
@@ -16,33 +29,106 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class SubtitleEntry:
-    """Estructura de datos para cada entrada de subtítulo"""
-    index: int
-    start_time: str
-    end_time: str
-    spanish_text: str
-    english_text: Optional[str] = None
-    start_ms: int = 0
-    end_ms: int = 0
-    duration_ms: int = 0
+# Entrada SRT: índice, inicio (hh, mm, ss, mmm), fin (hh, mm, ss, mmm) y texto
+# hasta la siguiente línea en blanco (vacío si el subtítulo no tiene texto)
+_SRT_RE = re.compile(
+    r'(\d+)\r?\n(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})(?:\r?\n(.*?))??(?=\r?\n\r?\n|\r?\n?\Z)',
+    re.S
+)
+
+class LocalTranslator:
+    """Traductor español -> inglés con NLLB-200 ejecutado localmente"""
+
+    def __init__(self, model_name: str = "facebook/nllb-200-distilled-600M", batch_size: int = 32):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        dtype = torch.float16 if self.device == "cuda" else torch.float32
+        logger.info(f"Cargando modelo de traducción {model_name} en {self.device}")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, src_lang="spa_Latn")
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=dtype).to(self.device)
+        self.model.eval()
+        self.batch_size = batch_size
+        self.target_token_id = self.tokenizer.convert_tokens_to_ids("eng_Latn")
+
+    def translate(self, texts: List[str]) -> List[str]:
+        """Traduce una lista de textos en lotes de tamaño batch_size"""
+        # Los textos vacíos se devuelven tal cual; NLLB puede inventar texto
+        # para una entrada vacía
+        results = list(texts)
+        pending = [i for i, text in enumerate(texts) if text.strip()]
+        for start in range(0, len(pending), self.batch_size):
+            positions = pending[start:start + self.batch_size]
+            batch = [texts[i] for i in positions]
+            inputs = self.tokenizer(batch, return_tensors="pt", padding=True, truncation=True).to(self.device)
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    **inputs,
+                    forced_bos_token_id=self.target_token_id,
+                    max_new_tokens=256
+                )
+            for i, translation in zip(positions, self.tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                results[i] = translation
+        return results
+
+class OnlineTranslator:
+    """Traductor español -> inglés vía Google Translate con peticiones concurrentes"""
+
+    URL = "https://translate.googleapis.com/translate_a/single"
+
+    def __init__(self, concurrency: int = 16, timeout: float = 30.0):
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def translate(self, texts: List[str]) -> List[str]:
+        """Traduce una lista de textos solapando la latencia de red entre peticiones"""
+        return asyncio.run(self._translate_all(texts))
+
+    async def _translate_all(self, texts: List[str]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async def translate_one(text: str) -> str:
+                if not text.strip():
+                    return text
+                async with semaphore:
+                    response = await client.get(self.URL, params={
+                        "client": "gtx", "sl": "es", "tl": "en", "dt": "t", "q": text
+                    })
+                    response.raise_for_status()
+                    # La respuesta trae una lista de fragmentos [traducción, original, ...]
+                    return "".join(part[0] for part in response.json()[0] if part[0])
+
+            # Conservar las traducciones correctas aunque alguna petición falle
+            results = list(await asyncio.gather(*(translate_one(text) for text in texts),
+                                                return_exceptions=True))
+
+            # Reintentar solo las entradas fallidas (p. ej. 429 o timeout) con el
+            # mismo cliente; si vuelven a fallar se deja el texto original
+            failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+            if failed:
+                logger.warning(f"Reintentando {len(failed)} traducciones fallidas")
+                retries = await asyncio.gather(*(translate_one(texts[i]) for i in failed),
+                                               return_exceptions=True)
+                for i, result in zip(failed, retries):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error traduciendo texto {i + 1}: {result}")
+                        result = texts[i]
+                    results[i] = result
+            return results
 
 class AudioSynchronizer:
-    def __init__(self, input_folder: str, output_folder: str):
+    def __init__(self, input_folder: str, output_folder: str,
+                 translator: Union[LocalTranslator, OnlineTranslator]):
         self.input_folder = input_folder
         self.output_folder = output_folder
-        self.translator = Translator()
-        self.entries: List[SubtitleEntry] = []
-
-    def parse_timestamp(self, timestamp: str) -> int:
-        """Convierte timestamp SRT a milisegundos"""
-        hours, minutes, seconds = timestamp.split(':')
-        seconds, milliseconds = seconds.split(',')
-        return (int(hours) * 3600000 + 
-                int(minutes) * 60000 + 
-                int(seconds) * 1000 + 
-                int(milliseconds))
+        self.translator = translator
+
+        # Subtítulos en columnas paralelas, ordenadas por tiempo de inicio
+        self.indices = np.empty(0, dtype=np.int64)
+        self.start_ms = np.empty(0, dtype=np.int64)
+        self.end_ms = np.empty(0, dtype=np.int64)
+        self.start_times: List[str] = []
+        self.end_times: List[str] = []
+        self.spanish_texts: List[str] = []
+        self.english_texts: List[Optional[str]] = []
 
     def parse_srt(self, file_path: str) -> None:
         """Lee y parsea el archivo SRT"""
@@ -50,49 +136,61 @@ class AudioSynchronizer:
         with open(file_path, 'r', encoding='utf-8') as file:
             content = file.read()
 
-        pattern = r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n((?:.*?\n)*?)\n'
-        matches = re.finditer(pattern, content, re.MULTILINE)
-
-        self.entries = []
-        for match in matches:
-            start_time = match.group(2)
-            end_time = match.group(3)
-            entry = SubtitleEntry(
-                index=int(match.group(1)),
-                start_time=start_time,
-                end_time=end_time,
-                spanish_text=match.group(4).strip(),
-                start_ms=self.parse_timestamp(start_time),
-                end_ms=self.parse_timestamp(end_time)
-            )
-            entry.duration_ms = entry.end_ms - entry.start_ms
-            self.entries.append(entry)
+        rows = _SRT_RE.findall(content)
+
+        # Convertir índices y timestamps a enteros, y los tiempos a milisegundos,
+        # en una sola operación
+        numbers = np.array([row[:9] for row in rows], dtype=np.int64).reshape(-1, 9)
+        ms_weights = np.array([3600000, 60000, 1000, 1], dtype=np.int64)
+        start_ms = numbers[:, 1:5] @ ms_weights
+        end_ms = numbers[:, 5:9] @ ms_weights
 
-        # Ordenar por tiempo de inicio
-        self.entries.sort(key=lambda x: x.start_ms)
-        logger.info(f"Procesados {len(self.entries)} subtítulos")
+        # Ordenar por tiempo de inicio, permutando todas las columnas a la vez
+        order = np.argsort(start_ms, kind='stable')
+        self.indices = numbers[order, 0]
+        self.start_ms = start_ms[order]
+        self.end_ms = end_ms[order]
+        self.start_times = [f"{rows[i][1]}:{rows[i][2]}:{rows[i][3]},{rows[i][4]}" for i in order]
+        self.end_times = [f"{rows[i][5]}:{rows[i][6]}:{rows[i][7]},{rows[i][8]}" for i in order]
+        self.spanish_texts = [rows[i][9].strip() for i in order]
+        self.english_texts = [None] * len(rows)
+
+        logger.info(f"Procesados {len(self.spanish_texts)} subtítulos")
 
     def translate_entries(self) -> None:
         """Traduce todos los subtítulos al inglés"""
         logger.info("Traduciendo subtítulos...")
-        for entry in self.entries:
+        try:
+            # Traducción de todo el lote de una vez
+            self.english_texts = self.translator.translate(self.spanish_texts)
+            for spanish, english in zip(self.spanish_texts, self.english_texts):
+                logger.debug(f"Traducido: {spanish} -> {english}")
+        except Exception as e:
+            logger.warning(f"Error en la traducción por lote, traduciendo uno a uno: {e}")
+            self._translate_entries_one_by_one()
+
+    def _translate_entries_one_by_one(self) -> None:
+        """Traduce cada subtítulo por separado"""
+        for i, (index, spanish) in enumerate(zip(self.indices, self.spanish_texts)):
             try:
-                translation = self.translator.translate(entry.spanish_text, dest='en')
-                entry.english_text = translation.text
-                logger.debug(f"Traducido: {entry.spanish_text} -> {entry.english_text}")
+                self.english_texts[i] = self.translator.translate([spanish])[0]
+                logger.debug(f"Traducido: {spanish} -> {self.english_texts[i]}")
             except Exception as e:
-                logger.error(f"Error traduciendo subtítulo {entry.index}: {e}")
-                entry.english_text = entry.spanish_text
+                logger.error(f"Error traduciendo subtítulo {index}: {e}")
+                self.english_texts[i] = spanish
 
     def save_translated_srt(self, output_srt_path: str) -> None:
         """Guarda los subtítulos traducidos en un archivo SRT."""
         logger.info(f"Guardando subtítulos traducidos en: {output_srt_path}")
         
+        parts = [
+            f"{index}\n{start} --> {end}\n{text}\n\n"
+            for index, start, end, text in zip(
+                self.indices.tolist(), self.start_times, self.end_times, self.english_texts
+            )
+        ]
         with open(output_srt_path, 'w', encoding='utf-8') as file:
-            for entry in self.entries:
-                file.write(f"{entry.index}\n")
-                file.write(f"{entry.start_time} --> {entry.end_time}\n")
-                file.write(f"{entry.english_text}\n\n")
+            file.write("".join(parts))
         logger.info(f"Subtítulos traducidos guardados en: {output_srt_path}")
 
 def main():
@@ -100,6 +198,19 @@ def main():
     output_folder = input_folder
 
     try:
+        # Cargar el modelo de traducción una sola vez para todos los archivos;
+        # sin transformers se traduce en línea con httpx
+        if HAS_LOCAL_MODEL:
+            translator = LocalTranslator()
+        elif HAS_HTTPX:
+            logger.warning("transformers no está instalado, usando traducción en línea")
+            translator = OnlineTranslator()
+        else:
+            raise RuntimeError(
+                "No hay traductor disponible: instala 'transformers' y 'torch' para "
+                "traducir localmente, o 'httpx' para traducir en línea"
+            )
+
         for file_name in os.listdir(input_folder):
             if not file_name.endswith("_no_silence.srt"):
                 continue
@@ -107,7 +218,7 @@ def main():
             logger.info(f"Procesando archivo: {file_name}")
             
             # Crear instancia del sincronizador
-            syncer = AudioSynchronizer(input_folder, output_folder)
+            syncer = AudioSynchronizer(input_folder, output_folder, translator)
             
             # Procesar archivo SRT
             srt_path = os.path.join(input_folder, file_name)
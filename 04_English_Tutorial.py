@@ -1,71 +1,41 @@
 import os
 import glob
 import subprocess
-from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_audioclips
+from multiprocessing import Pool
 
-def ajustar_audio(audio_clip, duration):
-    """Ajusta el audio para que coincida con la duración especificada"""
-    audio_duration = audio_clip.duration
-    if audio_duration < duration:
-        # Repetir el audio en bucle si es más corto
-        clips = [audio_clip] * int(duration // audio_duration) + [audio_clip.subclip(0, duration % audio_duration)]
-        return concatenate_audioclips(clips)
-    elif audio_duration > duration:
-        # Recortar el audio si es más largo
-        return audio_clip.subclip(0, duration)
-    return audio_clip
+def obtener_duracion(path):
+    """Obtiene la duración en segundos de un archivo multimedia con ffprobe"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
 
 def reemplazar_audio(video_path, audio_path, output_path):
-    video_clip = None
-    audio_clip = None
     try:
-        print("🎬 Cargando el video y el audio...")
+        # Copiar el video tal cual y sustituir solo la pista de audio; el audio
+        # se repite en bucle si es más corto y se recorta a la duración del video
+        video_duration = obtener_duracion(video_path)
 
-        # Cargar el video y el audio
-        video_clip = VideoFileClip(video_path)
-        audio_clip = AudioFileClip(audio_path)
-
-        # Ajustar el audio para que coincida con la duración del video
-        video_duration = video_clip.duration
-        audio_clip = ajustar_audio(audio_clip, video_duration)
-
-        # Asignar el nuevo audio al video
-        print("🔊 Asignando el nuevo audio al video...")
-        video_clip = video_clip.set_audio(audio_clip)
-
-        # Verificar soporte de GPU para NVIDIA
-        try:
-            result = subprocess.run(["ffmpeg", "-encoders"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            use_gpu = "h264_nvenc" in result.stdout
-            print("🚀 Usando la GPU NVIDIA para la codificación del video.") if use_gpu else print("❌ Usando códec predeterminado en CPU.")
-        except Exception as e:
-            print(f"❌ Error al verificar la GPU: {e}")
-            use_gpu = False
-
-        # Definir códecs y formatos compatibles
-        video_codec = "h264_nvenc" if use_gpu else "libx264"
-        audio_codec = "aac"
-
-        # Escribir el video con parámetros optimizados
         print(f"💾 Guardando el archivo con el nuevo audio como: {output_path}")
-        video_clip.write_videofile(
-            output_path,
-            codec=video_codec,
-            audio_codec=audio_codec,
-            audio_bitrate="192k",
-            threads=2,
-            preset="medium" if use_gpu else "fast",
-            ffmpeg_params=["-movflags", "faststart", "-pix_fmt", "yuv420p"]  # Configuración clave
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+                "-i", video_path,
+                "-stream_loop", "-1", "-i", audio_path,
+                "-map", "0:v:0", "-map", "1:a:0",
+                "-c:v", "copy",
+                "-c:a", "aac", "-b:a", "192k",
+                "-t", f"{video_duration:.3f}",
+                "-movflags", "+faststart",
+                output_path
+            ],
+            check=True
         )
         print(f"✅ El archivo ha sido guardado exitosamente como {output_path}")
     except Exception as e:
         print(f"❌ Error al procesar el video: {e}")
-    finally:
-        # Cerrar los clips para liberar recursos
-        if video_clip:
-            video_clip.close()
-        if audio_clip:
-            audio_clip.close()
 
 def procesar_archivos(video_folder, audio_folder, output_folder):
     if not os.path.exists(output_folder):
@@ -84,6 +54,7 @@ def procesar_archivos(video_folder, audio_folder, output_folder):
     for audio in audios:
         print(f"  - {os.path.basename(audio)}")
 
+    tareas = []
     for video_path in videos:
         video_filename = os.path.basename(video_path)
         fecha_video = video_filename.replace("_no_silence.mp4", "")
@@ -95,16 +66,23 @@ def procesar_archivos(video_folder, audio_folder, output_folder):
         if os.path.exists(matching_audio):
             output_path = os.path.join(output_folder, video_filename.replace("_no_silence", ""))
             print(f"🎥 Procesando video: {video_filename} con audio: {expected_audio_name}")
-            reemplazar_audio(video_path, matching_audio, output_path)
+            tareas.append((video_path, matching_audio, output_path))
         else:
             print(f"⚠️ No se encontró el archivo de audio correspondiente para el video {video_filename}")
 
-# Configurar las rutas de las carpetas
-video_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Videos ES"
-audio_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Subtitulos"
-output_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Videos ES\Output"
-
-# Ejecutar el procesamiento de los archivos
-print("🚀 Iniciando el procesamiento de videos y audios...")
-procesar_archivos(video_folder, audio_folder, output_folder)
-print("✅ Proceso completado.")
+    # Procesar los videos en paralelo
+    if tareas:
+        procesos = min(4, os.cpu_count() or 1, len(tareas))
+        with Pool(processes=procesos) as pool:
+            pool.starmap(reemplazar_audio, tareas)
+
+if __name__ == "__main__":
+    # Configurar las rutas de las carpetas
+    video_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Videos ES"
+    audio_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Subtitulos"
+    output_folder = r"C:\Users\wmate\OneDrive\Trabajo\UDEMY\YOLO\Videos\Videos ES\Output"
+
+    # Ejecutar el procesamiento de los archivos
+    print("🚀 Iniciando el procesamiento de videos y audios...")
+    procesar_archivos(video_folder, audio_folder, output_folder)
+    print("✅ Proceso completado.")